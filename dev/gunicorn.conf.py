@@ -0,0 +1,16 @@
+# gunicorn settings for the panel, used by serve.py. Also works directly from
+# this directory with: gunicorn -c gunicorn.conf.py main:app
+worker_class = "eventlet"
+# The OBD connection and the sensor loop must only run once, so stay on a
+# single worker
+workers = 1
+bind = "0.0.0.0:5000"
+# main is imported in the worker, after the eventlet worker has monkey patched
+# it. Importing it in the master would patch the arbiter too and break worker
+# restarts and shutdown.
+preload_app = False
+
+def post_worker_init(worker):
+    # Background tasks run in the worker, once it has loaded the app
+    from main import start_background_tasks
+    start_background_tasks()
@@ -1,55 +1,222 @@
+import eventlet
+eventlet.monkey_patch()
+
 from flask import Flask, jsonify, request, render_template
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import obd
+import orjson
 import time
-import threading
-import json
+import struct
+import sys
+import mmap
 import os
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+from types import MappingProxyType
+import numpy as np
+from numba import njit
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class OrjsonSocketIO:
+    """json module replacement for Socket.IO packets backed by orjson"""
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
-
-# OBD bağlantısı
+# Set CCPANEL_MESSAGE_QUEUE (e.g. redis://localhost:6379) to share emits with
+# other processes through a message queue
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode="eventlet",
+    json=OrjsonSocketIO,
+    message_queue=os.environ.get("CCPANEL_MESSAGE_QUEUE")
+)
+
+# OBD bağlantısı, obd_watchdog tarafından arka planda açılır. Until then the
+# sensor loop runs in simulation mode.
 connection = None
-try:
-    connection = obd.OBD()  # OBD bağlantısını aç (otomatik port algılar)
-    if connection.is_connected():
-        print("OBD bağlantısı başarılı")
-    else:
-        print("OBD bağlantısı kurulamadı, simülasyon moduna geçiliyor")
-        connection = None
-except:
-    print("OBD kütüphanesi veya bağlantı hatası, simülasyon moduna geçiliyor")
-    connection = None
-
-# Sensör komutları
-sensor_commands = {
-    "rpm": obd.commands.RPM,
-    "speed": obd.commands.SPEED,
-    "motor_load": obd.commands.ENGINE_LOAD,
-    "motor_temp": obd.commands.COOLANT_TEMP,
-    "oil_temp": obd.commands.OIL_TEMP,
-    "intake_pressure": obd.commands.INTAKE_PRESSURE,
-    "fuel_level": obd.commands.FUEL_LEVEL,
-    "battery_voltage": obd.commands.CONTROL_MODULE_VOLTAGE
-}
+# Poll function generated by build_poller for the connected car
+_poll = None
+OBD_RECONNECT_INTERVAL = 5  # seconds
+# Without an adapter each attempt is a full port scan that python-OBD logs, so
+# the retry interval doubles after every failure up to this limit
+OBD_RECONNECT_MAX_INTERVAL = 60  # seconds
+
+# is_connected() result is reused for up to a second by obd_connected()
+CONNECTION_CHECK_INTERVAL = 1.0  # seconds
+_conn_checked_at = float("-inf")
+_conn_ok = False
+
+def obd_connected():
+    """Return whether the OBD connection is up, checking it at most once per second"""
+    global _conn_checked_at, _conn_ok
+    
+    now = time.monotonic()
+    if now - _conn_checked_at >= CONNECTION_CHECK_INTERVAL:
+        _conn_ok = connection is not None and connection.is_connected()
+        _conn_checked_at = now
+    return _conn_ok
+
+# Value a sensor shows while connected when the car does not report it, 0
+# unless listed here. Stoichiometric ratio for the air fuel ratio.
+SENSOR_NULL_VALUES = {"air_fuel_ratio": 14.7}
+
+# Sensör komutları: (sensor key, OBD command, value transform, value when null)
+OBD_PIPELINE = [
+    ("rpm", obd.commands.RPM, int, 0),
+    ("speed", obd.commands.SPEED, int, 0),
+    ("motor_load", obd.commands.ENGINE_LOAD, int, 0),
+    ("motor_temp", obd.commands.COOLANT_TEMP, int, 0),
+    # Some cars may not support this
+    ("oil_temp", obd.commands.OIL_TEMP, int, 0),
+    # Intake pressure is used for turbo pressure, kPa to bar (1 bar = 100 kPa)
+    ("turbo_pressure", obd.commands.INTAKE_PRESSURE, lambda kpa: round(kpa / 100, 1), 0),
+    # Fuel level percentage to estimated L/100km (rough estimation, real
+    # calculation would need more data)
+    ("fuel_consumption", obd.commands.FUEL_LEVEL,
+     lambda percent: round(10 - (percent / 10), 1) if percent > 0 else 0, 0),
+    ("battery_voltage", obd.commands.CONTROL_MODULE_VOLTAGE, lambda volts: round(volts, 1), 0),
+]
+
+# Air Fuel Ratio is not available in every python-OBD release, check once here
+# instead of on every query.
+if obd.commands.has_name("AIR_FUEL_RATIO"):
+    OBD_PIPELINE.append(("air_fuel_ratio", obd.commands["AIR_FUEL_RATIO"], lambda ratio: round(ratio, 1),
+                         SENSOR_NULL_VALUES["air_fuel_ratio"]))
+
+def build_poller(entries):
+    """Generate a poll function specialized for the given OBD_PIPELINE entries"""
+    # Commands and transforms are bound as default arguments, so the generated
+    # code only touches local variables
+    if not entries:
+        return None
+    
+    namespace = {}
+    params = ["conn", "S"]
+    body = ["    query = conn.query"]
+    for n, (key, cmd, transform, default) in enumerate(entries):
+        namespace[f"_cmd_{n}"] = cmd
+        namespace[f"_xf_{n}"] = transform
+        params.append(f"_cmd_{n}=_cmd_{n}")
+        params.append(f"_xf_{n}=_xf_{n}")
+        body.append(f"    r = query(_cmd_{n})")
+        body.append(f"    S[{FIELD_IDX[key]}] = {default!r} if r.is_null() else _xf_{n}(r.value.magnitude)")
+    
+    src = f"def _poll({', '.join(params)}):\n" + "\n".join(body) + "\n"
+    exec(src, namespace)
+    return namespace["_poll"]
+
+def connect_obd():
+    """Open an async OBD connection that polls the sensor commands the car supports"""
+    global _poll
+    
+    # OBD bağlantısını aç (otomatik port algılar). python-OBD's defaults
+    # (fast=True, timeout=0.1) already send the expected response count with
+    # each mode 01 request, so no extra ELM327 setup (e.g. AT ST) is done here.
+    conn = obd.Async()
+    if not conn.is_connected():
+        conn.close()
+        return None
+    
+    # Unsupported commands (e.g. OIL_TEMP on many cars) are never queried
+    supported = [entry for entry in OBD_PIPELINE if conn.supports(entry[1])]
+    
+    # Sensors that are not polled would otherwise keep their last simulated
+    # value, show their null value instead
+    polled = {key for key, _, _, _ in supported}
+    for name in SENSOR_FIELDS:
+        if name not in polled:
+            _S[FIELD_IDX[name]] = SENSOR_NULL_VALUES.get(name, 0)
+    
+    # python-OBD's own thread keeps polling these, connection.query() then
+    # returns the latest response without touching the serial port
+    for _, cmd, _, _ in supported:
+        conn.watch(cmd)
+    conn.start()
+    
+    _poll = build_poller(supported)
+    return conn
+
+def obd_watchdog():
+    """Open the OBD connection in the background and reopen it when lost"""
+    global connection, _conn_checked_at
+    
+    retry_interval = OBD_RECONNECT_INTERVAL
+    while True:
+        if connection is None or not connection.is_connected():
+            if connection is not None:
+                print("OBD bağlantısı koptu, simülasyon moduna geçiliyor")
+                connection.close()
+                connection = None
+            
+            try:
+                connection = connect_obd()
+            except Exception:
+                connection = None
+            
+            # Connection object changed, drop the cached state
+            _conn_checked_at = float("-inf")
+            
+            if connection is None:
+                socketio.sleep(retry_interval)
+                retry_interval = min(retry_interval * 2, OBD_RECONNECT_MAX_INTERVAL)
+                continue
+            
+            print("OBD bağlantısı başarılı")
+            retry_interval = OBD_RECONNECT_INTERVAL
+        
+        socketio.sleep(OBD_RECONNECT_INTERVAL)
 
 # Global state
-sensor_data = {
-    "turbo_pressure": 1.2,
-    "air_fuel_ratio": 14.7,
-    "rpm": 0,
-    "speed": 0,
-    "fuel_consumption": 0,
-    "motor_load": 0,
-    "motor_temp": 0,
-    "oil_temp": 0,
-    "battery_voltage": 0
-}
+# Sensor values are kept in a float32 array, FIELD_IDX maps each sensor key to
+# its slot
+SENSOR_FIELDS = (
+    "turbo_pressure",
+    "air_fuel_ratio",
+    "rpm",
+    "speed",
+    "fuel_consumption",
+    "motor_load",
+    "motor_temp",
+    "oil_temp",
+    "battery_voltage"
+)
+FIELD_IDX = {name: i for i, name in enumerate(SENSOR_FIELDS)}
+
+# Sensors reported as whole numbers, the others have one decimal
+INT_FIELDS = frozenset(("rpm", "speed", "motor_load", "motor_temp", "oil_temp"))
+_INT_MASK = np.array([name in INT_FIELDS for name in SENSOR_FIELDS])
+_FIELD_CAST = tuple(int if name in INT_FIELDS else (lambda v: round(v, 1)) for name in SENSOR_FIELDS)
+
+_S = np.zeros(len(SENSOR_FIELDS), dtype=np.float32)
+_S[FIELD_IDX["turbo_pressure"]] = 1.2
+_S[FIELD_IDX["air_fuel_ratio"]] = 14.7
+
+def sensor_value(key):
+    return _FIELD_CAST[FIELD_IDX[key]](float(_S[FIELD_IDX[key]]))
+
+def sensor_snapshot(indices=None):
+    """Return sensor values as a dict of plain Python numbers"""
+    values = _S.tolist()
+    if indices is None:
+        indices = range(len(SENSOR_FIELDS))
+    return {SENSOR_FIELDS[i]: _FIELD_CAST[i](values[i]) for i in indices}
 
 error_codes = []
 
@@ -80,230 +247,241 @@ LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-current_log_file = None
-last_hour = None
-
-def get_log_filename():
-    now = datetime.now()
-    return f"{LOG_DIR}/sensor_data_{now.strftime('%Y-%m-%d_%H')}.json"
-
-def rotate_logs():
-    global current_log_file, last_hour
+# The last two hours of samples are kept in a fixed-size ring file that is
+# written through mmap. The file starts with the index of the next record to
+# write, followed by LOG_RECORD_COUNT records of a float64 timestamp and the
+# float32 sensor values (LOG_RECORD). Slots that were never written have a
+# zero timestamp.
+LOG_RING_FILE = f"{LOG_DIR}/sensor_data_ring.bin"
+LOG_HEADER = struct.Struct("<Q")
+LOG_RECORD = struct.Struct("<d" + "f" * len(SENSOR_FIELDS))
+LOG_RECORD_COUNT = 2 * 3600 * 2  # 2 hours at 2Hz
+LOG_RING_SIZE = LOG_HEADER.size + LOG_RECORD_COUNT * LOG_RECORD.size
+
+def open_log_ring(path=LOG_RING_FILE):
+    """Map the log ring file, creating it or resetting it if its size is wrong"""
+    with open(path, "a+b") as f:
+        if os.fstat(f.fileno()).st_size != LOG_RING_SIZE:
+            f.truncate(0)
+            f.truncate(LOG_RING_SIZE)
+        return mmap.mmap(f.fileno(), LOG_RING_SIZE)
+
+# Set up by init_log_ring() when the server starts, so importing this module
+# does not touch the ring file
+_log_mm = None
+_log_head = 0
+_log_timestamps = None
+_log_sensors = None
+
+def init_log_ring():
+    """Open the log ring file and restore the write position"""
+    global _log_mm, _log_head, _log_timestamps, _log_sensors
     
-    now = datetime.now()
-    current_hour = now.strftime('%Y-%m-%d_%H')
+    _log_mm = open_log_ring()
+    _log_head = LOG_HEADER.unpack_from(_log_mm)[0] % LOG_RECORD_COUNT
     
-    if current_hour != last_hour:
-        if current_log_file:
-            current_log_file.close()
-        
-        # Create new log file
-        current_log_file = open(get_log_filename(), "a")
-        last_hour = current_hour
-        
-        # Delete logs older than 2 hours
-        two_hours_ago = now - timedelta(hours=2)
-        old_file = f"{LOG_DIR}/sensor_data_{two_hours_ago.strftime('%Y-%m-%d_%H')}.json"
-        if os.path.exists(old_file):
-            os.remove(old_file)
+    # NumPy views onto the records in the map, so a sample is copied straight
+    # from _S into its slot without building intermediate Python objects
+    records = np.ndarray(
+        (LOG_RECORD_COUNT,),
+        dtype=np.dtype([("timestamp", "<f8"), ("sensors", "<f4", (len(SENSOR_FIELDS),))]),
+        buffer=_log_mm,
+        offset=LOG_HEADER.size
+    )
+    _log_timestamps = records["timestamp"]
+    _log_sensors = records["sensors"]
 
 def log_sensor_data():
-    rotate_logs()
+    global _log_head
     
-    log_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "sensors": sensor_data.copy()
-    }
+    _log_timestamps[_log_head] = time.time()
+    _log_sensors[_log_head] = _S
+    _log_head = (_log_head + 1) % LOG_RECORD_COUNT
+    LOG_HEADER.pack_into(_log_mm, 0, _log_head)
+
+def read_logs(path=LOG_RING_FILE):
+    """Yield the logged samples in a log ring file, oldest first"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            (head,) = LOG_HEADER.unpack_from(mm)
+            split = LOG_HEADER.size + head * LOG_RECORD.size
+            records = mm[split:] + mm[LOG_HEADER.size:split]
     
-    if current_log_file:
-        current_log_file.write(json.dumps(log_entry) + "\n")
-        current_log_file.flush()
+    for timestamp, *values in LOG_RECORD.iter_unpack(records):
+        if timestamp:
+            yield {
+                "timestamp": timestamp,
+                "sensors": {name: cast(value) for name, cast, value in zip(SENSOR_FIELDS, _FIELD_CAST, values)}
+            }
 
 def get_obd_data():
     """Get real sensor data from OBD"""
-    if connection is None or not connection.is_connected():
-        # Fallback to simulation if no connection
+    if connection is None or _poll is None or not obd_connected():
+        # Fallback to simulation if no connection or no supported sensor
         simulate_obd_data()
         return
     
-    # RPM
-    cmd = obd.commands.RPM
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["rpm"] = 0
-    else:
-        sensor_data["rpm"] = int(response.value.magnitude)
-    
-    # Speed
-    cmd = obd.commands.SPEED
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["speed"] = 0
-    else:
-        sensor_data["speed"] = int(response.value.magnitude)
-    
-    # Engine Load
-    cmd = obd.commands.ENGINE_LOAD
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["motor_load"] = 0
-    else:
-        sensor_data["motor_load"] = int(response.value.magnitude)
-    
-    # Coolant Temp
-    cmd = obd.commands.COOLANT_TEMP
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["motor_temp"] = 0
-    else:
-        sensor_data["motor_temp"] = int(response.value.magnitude)
-    
-    # Oil Temp (some cars may not support this)
-    cmd = obd.commands.OIL_TEMP
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["oil_temp"] = 0
-    else:
-        sensor_data["oil_temp"] = int(response.value.magnitude)
-    
-    # Intake Pressure (used for turbo pressure)
-    cmd = obd.commands.INTAKE_PRESSURE
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["turbo_pressure"] = 0
-    else:
-        # Convert kPa to bar (1 bar = 100 kPa)
-        sensor_data["turbo_pressure"] = round(response.value.magnitude / 100, 1)
-    
-    # Fuel Level
-    cmd = obd.commands.FUEL_LEVEL
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["fuel_consumption"] = 0
-    else:
-        # Convert percentage to estimated L/100km (rough estimation)
-        fuel_percent = response.value.magnitude
-        if fuel_percent > 0:
-            # This is a rough estimation, real calculation would need more data
-            sensor_data["fuel_consumption"] = round(10 - (fuel_percent / 10), 1)
-        else:
-            sensor_data["fuel_consumption"] = 0
-    
-    # Battery Voltage
-    cmd = obd.commands.CONTROL_MODULE_VOLTAGE
-    response = connection.query(cmd)
-    if response.is_null():
-        sensor_data["battery_voltage"] = 0
-    else:
-        sensor_data["battery_voltage"] = round(response.value.magnitude, 1)
-    
-    # Air Fuel Ratio (if supported)
-    try:
-        cmd = obd.commands.AIR_FUEL_RATIO
-        response = connection.query(cmd)
-        if response.is_null():
-            sensor_data["air_fuel_ratio"] = 14.7  # Stoichiometric ratio
-        else:
-            sensor_data["air_fuel_ratio"] = round(response.value.magnitude, 1)
-    except:
-        sensor_data["air_fuel_ratio"] = 14.7
+    _poll(connection, _S)
+
+# DTC descriptions mapping. Keys and looked-up codes are both interned, and
+# entries are read-only, so lookups (and misses, via _UNKNOWN_DTC) allocate
+# nothing.
+DTC_DESCRIPTIONS = MappingProxyType({
+    sys.intern(code): MappingProxyType(description)
+    for code, description in {
+        "P0300": {"title": "Rastgele Silindir Ateşleme Hatası", "description": "Motorun silindirlerinden birinde veya birkaçında ateşleme hatası tespit edildi."},
+        "P0171": {"title": "Sistem Zayıf (Bank 1)", "description": "Motorun yakıt sistemi çok fakir bir karışım sağlıyor."},
+        "P0420": {"title": "Katalitik Konvertör Verimliliği", "description": "Katalitik konvertörün verimliliği eşik değerin altında."},
+        "P0455": {"title": "Emme Kontrol Sistemi Büyük Sızıntı", "description": "Yakıt buharı emme kontrol sisteminde büyük bir sızıntı tespit edildi."},
+        "P0101": {"title": "MAF Sensörü Devre Aralığı/Performans", "description": "Kütle hava akış sensöründe aralık veya performans sorunu."},
+        "P0135": {"title": "O2 Sensörü Isıtıcı Devresi (Bank 1, Sensör 1)", "description": "Oksijen sensörü ısıtıcı devresinde arıza."},
+        "P0301": {"title": "Silindir 1 Ateşleme Hatası", "description": "Silindir 1'de ateşleme hatası tespit edildi."},
+        "P0442": {"title": "Emme Kontrol Sistemi Küçük Sızıntı", "description": "Yakıt buharı emme kontrol sisteminde küçük bir sızıntı tespit edildi."},
+        "P0500": {"title": "Hız Sensörü", "description": "Araç hızı sensöründe arıza."}
+    }.items()
+})
+_UNKNOWN_DTC = MappingProxyType({"title": "Hata Kodu", "description": "Tanımlanmamış hata kodu."})
+
+# Demo errors shown when there is no OBD connection
+DEMO_DTC_CODES = ("P0300", "P0171", "P0420", "P0455")
 
 def get_dtc_codes():
     """Get Diagnostic Trouble Codes from OBD"""
     global error_codes
     
-    if connection is None or not connection.is_connected():
-        # Fallback to demo errors if no connection
-        error_codes = [
-            {"code": "P0300", "title": "Rastgele Silindir Ateşleme Hatası", "description": "Motorun silindirlerinden birinde veya birkaçında ateşleme hatası tespit edildi.", "time": datetime.now().strftime("%d.%m.%Y %H:%M")},
-            {"code": "P0171", "title": "Sistem Zayıf (Bank 1)", "description": "Motorun yakıt sistemi çok fakir bir karışım sağlıyor.", "time": datetime.now().strftime("%d.%m.%Y %H:%M")},
-            {"code": "P0420", "title": "Katalitik Konvertör Verimliliği", "description": "Katalitik konvertörün verimliliği eşik değerin altında.", "time": datetime.now().strftime("%d.%m.%Y %H:%M")},
-            {"code": "P0455", "title": "Emme Kontrol Sistemi Büyük Sızıntı", "description": "Yakıt buharı emme kontrol sisteminde büyük bir sızıntı tespit edildi.", "time": datetime.now().strftime("%d.%m.%Y %H:%M")}
-        ]
-        return
+    now_str = datetime.now().strftime("%d.%m.%Y %H:%M")
     
-    # Get DTC codes
-    cmd = obd.commands.GET_DTC
-    response = connection.query(cmd)
-    
-    if response.is_null():
-        error_codes = []
+    if connection is None or not obd_connected():
+        # Fallback to demo errors if no connection
+        dtc_list = DEMO_DTC_CODES
     else:
-        error_codes = []
-        dtc_list = response.value
-        
-        # DTC descriptions mapping
-        dtc_descriptions = {
-            "P0300": {"title": "Rastgele Silindir Ateşleme Hatası", "description": "Motorun silindirlerinden birinde veya birkaçında ateşleme hatası tespit edildi."},
-            "P0171": {"title": "Sistem Zayıf (Bank 1)", "description": "Motorun yakıt sistemi çok fakir bir karışım sağlıyor."},
-            "P0420": {"title": "Katalitik Konvertör Verimliliği", "description": "Katalitik konvertörün verimliliği eşik değerin altında."},
-            "P0455": {"title": "Emme Kontrol Sistemi Büyük Sızıntı", "description": "Yakıt buharı emme kontrol sisteminde büyük bir sızıntı tespit edildi."},
-            "P0101": {"title": "MAF Sensörü Devre Aralığı/Performans", "description": "Kütle hava akış sensöründe aralık veya performans sorunu."},
-            "P0135": {"title": "O2 Sensörü Isıtıcı Devresi (Bank 1, Sensör 1)", "description": "Oksijen sensörü ısıtıcı devresinde arıza."},
-            "P0301": {"title": "Silindir 1 Ateşleme Hatası", "description": "Silindir 1'de ateşleme hatası tespit edildi."},
-            "P0442": {"title": "Emme Kontrol Sistemi Küçük Sızıntı", "description": "Yakıt buharı emme kontrol sisteminde küçük bir sızıntı tespit edildi."},
-            "P0500": {"title": "Hız Sensörü", "description": "Araç hızı sensöründe arıza."}
-        }
+        # Get DTC codes. GET_DTC is not watched, so pause the async poller
+        # and send a regular synchronous query.
+        with connection.paused():
+            response = obd.OBD.query(connection, obd.commands.GET_DTC)
+        # python-OBD returns (code, description) tuples, only the code is used.
+        # Interning it lets the DTC_DESCRIPTIONS lookup match by identity.
+        dtc_list = [] if response.is_null() else [sys.intern(code) for code, _ in response.value]
+    
+    codes = []
+    for code in dtc_list:
+        description = DTC_DESCRIPTIONS.get(code, _UNKNOWN_DTC)
         
-        for dtc in dtc_list:
-            code = str(dtc)
-            description = dtc_descriptions.get(code, {
-                "title": f"Hata Kodu {code}",
-                "description": "Tanımlanmamış hata kodu."
-            })
-            
-            error_codes.append({
-                "code": code,
-                "title": description["title"],
-                "description": description["description"],
-                "time": datetime.now().strftime("%d.%m.%Y %H:%M")
-            })
+        codes.append({
+            "code": code,
+            "title": description["title"],
+            "description": description["description"],
+            "time": now_str
+        })
+    error_codes = codes
+
+_SIM_RNG = np.random.default_rng()
+_SIM_RND = np.empty(len(SENSOR_FIELDS))
+# Simulated value range of each sensor, in SENSOR_FIELDS order
+_SIM_LOW = np.array([0.8, 14.0, 1500, 60, 6.0, 40, 85, 80, 12.0])
+_SIM_SPAN = np.array([0.8, 1.5, 2500, 80, 3.0, 40, 25, 20, 0.8])
+
+@njit(cache=True)
+def _simulate(S, rnd, low, span, int_mask):
+    for i in range(S.shape[0]):
+        value = low[i] + rnd[i] * span[i]
+        if int_mask[i]:
+            S[i] = np.floor(value)
+        else:
+            S[i] = round(value, 1)
 
 def simulate_obd_data():
     """Simulate OBD data when real connection is not available"""
-    # Simulate realistic sensor values with some randomness
-    sensor_data["turbo_pressure"] = round(0.8 + random.random() * 0.8, 1)
-    sensor_data["air_fuel_ratio"] = round(14.0 + random.random() * 1.5, 1)
-    sensor_data["rpm"] = int(1500 + random.random() * 2500)
-    sensor_data["speed"] = int(60 + random.random() * 80)
-    sensor_data["fuel_consumption"] = round(6.0 + random.random() * 3.0, 1)
-    sensor_data["motor_load"] = int(40 + random.random() * 40)
-    sensor_data["motor_temp"] = int(85 + random.random() * 25)
-    sensor_data["oil_temp"] = int(80 + random.random() * 20)
-    sensor_data["battery_voltage"] = round(12.0 + random.random() * 0.8, 1)
+    # Simulate realistic sensor values with some randomness, drawing all
+    # random numbers for the tick at once
+    _SIM_RNG.random(out=_SIM_RND)
+    _simulate(_S, _SIM_RND, _SIM_LOW, _SIM_SPAN, _INT_MASK)
+
+# Alert thresholds
+MOTOR_TEMP_LIMIT = 100.0
+BATTERY_VOLTAGE_LIMIT = 12.0
+_MOTOR_TEMP = FIELD_IDX["motor_temp"]
+_BATTERY_VOLTAGE = FIELD_IDX["battery_voltage"]
+
+@njit(cache=True)
+def _check_thresholds(S):
+    return S[_MOTOR_TEMP] > MOTOR_TEMP_LIMIT, S[_BATTERY_VOLTAGE] < BATTERY_VOLTAGE_LIMIT
+
+# Broadcasts are coalesced into 50ms frames. The outbox keeps only the latest
+# payload per (event, key), so a burst of updates to the same thing (e.g. a
+# volume slider drag) reaches the clients as a single message per frame.
+EMIT_FRAME_INTERVAL = 0.05  # seconds
+_outbox = {}
+
+def queue_emit(event, payload, key=None, merge=False):
+    """Queue a broadcast to all clients for the next frame"""
+    if merge:
+        # Fold a dict payload into the pending one so no field is lost
+        _outbox.setdefault((event, key), {}).update(payload)
+    else:
+        _outbox[(event, key)] = payload
+
+def emit_flusher():
+    """Send the queued broadcasts every 50ms"""
+    global _outbox
+    
+    while True:
+        socketio.sleep(EMIT_FRAME_INTERVAL)
+        if _outbox:
+            pending, _outbox = _outbox, {}
+            for (event, _), payload in pending.items():
+                socketio.emit(event, payload)
 
 def update_sensors():
-    """Update sensor data every 500ms and send via WebSocket"""
+    """Update sensor data every 500ms and send changed values via WebSocket"""
+    # NaN never compares equal, so the first tick sends every value
+    prev = np.full_like(_S, np.nan)
     while True:
         get_obd_data()
         log_sensor_data()
         
-        # Send sensor data via WebSocket
-        socketio.emit('sensor_update', sensor_data)
+        # Send only the sensor values that changed since the last tick,
+        # clients get the full state on connect
+        changed = np.nonzero(_S != prev)[0]
+        if changed.size:
+            queue_emit('sensor_update', sensor_snapshot(changed.tolist()), merge=True)
+            prev[:] = _S
         
         # Check for critical values and send alerts
-        if sensor_data["motor_temp"] > 100:
-            socketio.emit('alert', {
+        motor_temp_high, battery_voltage_low = _check_thresholds(_S)
+        if motor_temp_high:
+            queue_emit('alert', {
                 'type': 'warning',
                 'message': 'Motor sıcaklığı kritik seviyede!',
-                'value': sensor_data["motor_temp"]
-            })
+                'value': sensor_value("motor_temp")
+            }, key="motor_temp")
         
-        if sensor_data["battery_voltage"] < 12.0:
-            socketio.emit('alert', {
+        if battery_voltage_low:
+            queue_emit('alert', {
                 'type': 'warning',
                 'message': 'Akü voltajı düşük!',
-                'value': sensor_data["battery_voltage"]
-            })
+                'value': sensor_value("battery_voltage")
+            }, key="battery_voltage")
             
-        time.sleep(0.5)
+        socketio.sleep(0.5)
 
 def update_errors():
     """Update error codes every 15 minutes and send via WebSocket"""
     while True:
         get_dtc_codes()
-        socketio.emit('error_update', error_codes)
-        time.sleep(900)  # 15 minutes
+        queue_emit('error_update', error_codes)
+        socketio.sleep(900)  # 15 minutes
+
+def _get_json_fast():
+    """Return the parsed JSON object of the request, or {} if it is missing or invalid"""
+    data = request.get_json(cache=True, silent=True)
+    return data if isinstance(data, dict) else {}
+
+def _valid_station(station):
+    return type(station) is int and 0 <= station < len(radio_data['stations'])
+
+def _valid_volume(volume):
+    return type(volume) is int and 0 <= volume <= 100
 
 # API Endpoints
 @app.route('/')
@@ -312,7 +490,7 @@ def index():
 
 @app.route('/api/sensors', methods=['GET'])
 def get_sensors():
-    return jsonify(sensor_data)
+    return jsonify(sensor_snapshot())
 
 @app.route('/api/errors', methods=['GET'])
 def get_errors():
@@ -325,14 +503,14 @@ def get_controls():
 @app.route('/api/control/<control_name>', methods=['POST'])
 def set_control(control_name):
     if control_name in control_states:
-        data = request.get_json()
+        data = _get_json_fast()
         if 'state' in data:
             control_states[control_name] = data['state']
             # Send control update via WebSocket
-            socketio.emit('control_update', {
+            queue_emit('control_update', {
                 'control': control_name,
                 'state': control_states[control_name]
-            })
+            }, key=control_name)
             return jsonify({"success": True, "control": control_name, "state": control_states[control_name]})
     return jsonify({"success": False, "error": "Invalid control"}), 400
 
@@ -342,39 +520,42 @@ def get_radio():
 
 @app.route('/api/radio/station', methods=['POST'])
 def set_radio_station():
-    data = request.get_json()
-    if 'station' in data and 0 <= data['station'] < len(radio_data['stations']):
-        radio_data['current_station'] = data['station']
+    data = _get_json_fast()
+    station = data.get('station')
+    if _valid_station(station):
+        radio_data['current_station'] = station
         # Send radio update via WebSocket
-        socketio.emit('radio_update', radio_data)
+        queue_emit('radio_update', radio_data)
         return jsonify({"success": True})
     return jsonify({"success": False, "error": "Invalid station"}), 400
 
 @app.route('/api/radio/play', methods=['POST'])
 def set_radio_play():
-    data = request.get_json()
+    data = _get_json_fast()
     if 'playing' in data:
         radio_data['is_playing'] = data['playing']
         # Send radio update via WebSocket
-        socketio.emit('radio_update', radio_data)
+        queue_emit('radio_update', radio_data)
         return jsonify({"success": True})
     return jsonify({"success": False, "error": "Missing parameter"}), 400
 
 @app.route('/api/radio/volume', methods=['POST'])
 def set_radio_volume():
-    data = request.get_json()
-    if 'volume' in data and 0 <= data['volume'] <= 100:
-        radio_data['volume'] = data['volume']
+    data = _get_json_fast()
+    volume = data.get('volume')
+    if _valid_volume(volume):
+        radio_data['volume'] = volume
         # Send radio update via WebSocket
-        socketio.emit('radio_update', radio_data)
+        queue_emit('radio_update', radio_data)
         return jsonify({"success": True})
     return jsonify({"success": False, "error": "Invalid volume"}), 400
 
 @app.route('/api/obd/status', methods=['GET'])
 def get_obd_status():
+    connected = connection is not None and obd_connected()
     return jsonify({
-        "connected": connection is not None and connection.is_connected(),
-        "port": connection.port() if connection and connection.is_connected() else None
+        "connected": connected,
+        "port": connection.port_name() if connected else None
     })
 
 # WebSocket event handlers
@@ -382,15 +563,11 @@ def get_obd_status():
 def handle_connect():
     print('Client connected')
     # Send initial data to the newly connected client
-    emit('sensor_update', sensor_data)
+    emit('sensor_update', sensor_snapshot())
     emit('error_update', error_codes)
     
-    # Send each control state individually
-    for control_name, state in control_states.items():
-        emit('control_update', {
-            'control': control_name,
-            'state': state
-        })
+    # Send all control states in a single message
+    emit('controls_bulk', control_states)
     
     emit('radio_update', radio_data)
 
@@ -406,41 +583,42 @@ def handle_control_change(data):
     if control_name in control_states:
         control_states[control_name] = state
         # Broadcast the control change to all clients
-        emit('control_update', {
+        queue_emit('control_update', {
             'control': control_name,
             'state': state
-        }, broadcast=True)
+        }, key=control_name)
 
 @socketio.on('radio_change')
 def handle_radio_change(data):
-    if 'station' in data and 0 <= data['station'] < len(radio_data['stations']):
+    if _valid_station(data.get('station')):
         radio_data['current_station'] = data['station']
         # Broadcast the radio change to all clients
-        emit('radio_update', radio_data, broadcast=True)
+        queue_emit('radio_update', radio_data)
     
     if 'playing' in data:
         radio_data['is_playing'] = data['playing']
         # Broadcast the radio change to all clients
-        emit('radio_update', radio_data, broadcast=True)
+        queue_emit('radio_update', radio_data)
     
-    if 'volume' in data and 0 <= data['volume'] <= 100:
+    if _valid_volume(data.get('volume')):
         radio_data['volume'] = data['volume']
         # Broadcast the radio change to all clients
-        emit('radio_update', radio_data, broadcast=True)
+        queue_emit('radio_update', radio_data)
 
-if __name__ == '__main__':
-    # Start background threads
-    sensor_thread = threading.Thread(target=update_sensors, daemon=True)
-    error_thread = threading.Thread(target=update_errors, daemon=True)
+def start_background_tasks():
+    """Start the background tasks, once per server process"""
+    init_log_ring()
     
-    sensor_thread.start()
-    error_thread.start()
-    
-    # Initialize log file
-    rotate_logs()
+    socketio.start_background_task(obd_watchdog)
+    socketio.start_background_task(emit_flusher)
+    socketio.start_background_task(update_sensors)
+    socketio.start_background_task(update_errors)
     
     # Initial data fetch
     get_obd_data()
     get_dtc_codes()
-    
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+
+if __name__ == '__main__':
+    # Development server, use serve.py (gunicorn) in production
+    start_background_tasks()
+    socketio.run(app, host='0.0.0.0', port=5000)
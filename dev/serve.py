@@ -0,0 +1,17 @@
+import os
+import sys
+
+from gunicorn.app.wsgiapp import run
+
+# Production entry point, serves main:app with gunicorn using gunicorn.conf.py.
+# The app is only imported in the worker, so the gunicorn master stays free
+# of eventlet's monkey patching.
+if __name__ == '__main__':
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.argv = [
+        sys.argv[0],
+        "--config", os.path.join(here, "gunicorn.conf.py"),
+        "--chdir", here,
+        "main:app"
+    ]
+    run()